@@ -10,18 +10,36 @@ Features:
  - Search with adjustable k and display mode
 """
 
+import os
 import re
 import sys
 import queue
+import select
 import threading
 import subprocess
 import time
 from datetime import datetime
+from collections import Counter
 
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 
+# Optional: google-re2 scans in guaranteed linear time, which caps the
+# cost of normalizing adversarial log lines. Fall back to the stdlib
+# engine when it isn't installed.
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Optional: reading the journal natively through sd-journal avoids the
+# journalctl child process and its format-then-reparse text round-trip.
+try:
+    from systemd import journal as sd_journal
+except ImportError:
+    sd_journal = None
+
 # Configuration
 JOURNALCTL_CMD = ["journalctl", "-f", "-o", "short"]
 EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
@@ -29,21 +47,101 @@ EMBED_DIM = 384
 BATCH_SIZE = 16
 DEFAULT_K = 5
 FLUSH_INTERVAL = 10  # seconds between repeated-log summaries
+MERGE_BATCH_SIZE = 200  # lines accumulated locally before merging into the cache
+MERGE_INTERVAL = 1.0  # max seconds between cache merges
+RECONNECT_DELAY = 5  # seconds before reopening a dead log source
 
 # Global state
 log_queue = queue.Queue()
-metadata = []  # list of {"id": int, "text": str, "timestamp": float}
+# Metadata for indexed logs, kept as parallel arrays: FAISS row i maps to
+# position i in each list (leaner than a dict per entry, and the search
+# path only touches the columns it needs)
+meta_ids = []
+meta_texts = []
+meta_timestamps = []
 metadata_lock = threading.Lock()
 index = None
 model = None
 
 # Repeat detection cache
-repeat_cache = {}  # {normalized_message: count}
+repeat_cache = Counter()  # {normalized_message: count}
 cache_lock = threading.Lock()
+cache_cv = threading.Condition(cache_lock)  # signaled when new lines are merged
 
 # Shutdown event
 shutdown_event = threading.Event()
 
+# Combined pattern for normalize_log: one scan handles the syslog header,
+# PID markers, and whitespace runs. The PID branch matches a whole run of
+# "[1234]" markers together with the whitespace around them, so the
+# callback can collapse the run to a single space exactly like the old
+# remove-then-collapse passes did.
+NORMALIZE_PATTERN = (
+    r'(?P<HDR>^[A-Z][a-z]{2}\s+\d+\s+\d+:\d+:\d+\s+\S+\s+)'
+    r'|(?P<PID>\s*(?:\[\d+\]\s*)+)'
+    r'|(?P<WS>\s+)'
+)
+HAS_WHITESPACE_RE = re.compile(r'\s')
+
+
+def _normalize_repl(match):
+    group = match.lastgroup
+    if group == "WS":
+        return ' '
+    if group == "PID":
+        # A PID run that had whitespace around it collapses to one space;
+        # one jammed between words ("prog[1]:") disappears entirely
+        return ' ' if HAS_WHITESPACE_RE.search(match.group()) else ''
+    return ''  # HDR
+
+
+def _compile_normalize_re():
+    """
+    Compile the combined normalize pattern, preferring re2 when available.
+
+    re2 mostly mirrors the re API but not perfectly (e.g. match-object
+    attributes), so the compiled candidate is probed against the stdlib
+    engine on a representative line and dropped on any mismatch.
+    """
+    compiled = re.compile(NORMALIZE_PATTERN)
+    if re2 is not None:
+        sample = "Nov 04 23:58:33 archlinux systemd[1]:  job [2] failed  [3]x"
+        try:
+            candidate = re2.compile(NORMALIZE_PATTERN)
+            if (candidate.sub(_normalize_repl, sample)
+                    == compiled.sub(_normalize_repl, sample)):
+                return candidate
+        except Exception:
+            pass
+    return compiled
+
+
+NORMALIZE_RE = _compile_normalize_re()
+
+# Reduced pattern for lines whose header was already stripped by the
+# fast path below: just PID runs and whitespace, no anchored header
+# branch (which could otherwise eat a header-looking message body)
+PID_WS_RE = re.compile(
+    r'(?P<PID>\s*(?:\[\d+\]\s*)+)'
+    r'|(?P<WS>\s+)'
+)
+
+
+def _is_syslog_header(mon: str, day: str, hms: str) -> bool:
+    """
+    Check the first three whitespace-separated tokens of a line against
+    the "Mon DD HH:MM:SS" shape, using the same ASCII classes as the
+    header regex so the fast path never fires where the regex wouldn't.
+    """
+    if not (len(mon) == 3 and mon[1:].isascii()
+            and mon[1:].isalpha() and mon[1:].islower()):
+        return False
+    if not (day.isascii() and day.isdigit()):
+        return False
+    groups = hms.split(':')
+    return (len(groups) == 3
+            and all(g.isascii() and g.isdigit() for g in groups))
+
 
 def normalize_log(line: str) -> str:
     """
@@ -57,56 +155,104 @@ def normalize_log(line: str) -> str:
     This allows detection of identical log messages that only differ in
     timestamp, hostname, or process ID.
     """
-    # Remove leading timestamp (e.g., "Nov 04 23:58:33") and hostname
-    line = re.sub(r'^[A-Z][a-z]{2}\s+\d+\s+\d+:\d+:\d+\s+\S+\s+', '', line)
-    
-    # Remove PID markers like [1234]
-    line = re.sub(r'\[\d+\]', '', line)
-    
-    # Normalize multiple spaces to single space
-    line = re.sub(r'\s+', ' ', line)
-    
-    return line.strip()
+    # Fast path: the overwhelmingly common "Mon DD HH:MM:SS host rest"
+    # shape is recognized and split without the regex engine; only the
+    # message body still needs PID/whitespace cleanup
+    if line[:1].isascii() and line[:1].isupper():
+        parts = line.split(None, 4)
+        if len(parts) == 5 and _is_syslog_header(parts[0], parts[1], parts[2]):
+            rest = parts[4]
+            if '[' not in rest:
+                # No PID marker can match: whitespace collapse is all
+                # that's left, and split/join does it without a regex
+                return ' '.join(rest.split())
+            return PID_WS_RE.sub(_normalize_repl, rest).strip()
+    elif '[' not in line:
+        # The header branch needs a leading capital and the PID branch
+        # needs a bracket; with neither, only whitespace runs remain
+        return ' '.join(line.split())
 
+    # General path: strip leading timestamp/hostname, remove PID markers
+    # like [1234], and collapse whitespace runs in a single pass
+    return NORMALIZE_RE.sub(_normalize_repl, line).strip()
 
-def watch_journalctl():
+
+def _merge_counts(pending):
+    """
+    Merge a local {normalized_message: count} batch into the shared repeat
+    cache and wake the flusher. Clears the local batch.
     """
-    Stream logs from journalctl in real-time.
+    if not pending:
+        return
+    with cache_cv:
+        repeat_cache.update(pending)  # Counter.update adds counts
+        cache_cv.notify()
+    pending.clear()
+
+
+def _watch_journalctl_once():
+    """
+    Run one journalctl session until it ends or shutdown is requested.
     
     Runs journalctl -f and normalizes each log line for deduplication.
-    Stores normalized logs in the repeat cache for batch processing.
+    Normalized lines are counted in a small local batch first, then merged
+    into the shared repeat cache every MERGE_BATCH_SIZE lines or
+    MERGE_INTERVAL seconds, so the cache lock is taken once per batch
+    instead of once per line.
     """
     proc = None
+    pending = Counter()  # local {normalized_message: count}, merged in batches
+
     try:
         proc = subprocess.Popen(
             JOURNALCTL_CMD,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
+            bufsize=0
         )
-        
+
+        fd = proc.stdout.fileno()
+        buf = b""
+        last_merge = time.monotonic()
+
         while not shutdown_event.is_set():
-            line = proc.stdout.readline()
-            if not line:
-                if proc.poll() is not None:
-                    # Process has terminated
+            # One select + one large read per burst of lines, instead of a
+            # read syscall per line; the timeout keeps the periodic merge
+            # honest while the stream is idle
+            ready, _, _ = select.select([fd], [], [], MERGE_INTERVAL)
+            if ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    # EOF - journalctl has terminated
                     break
-                continue
-            
-            line = line.rstrip("\n")
-            if not line:
-                continue
-            
-            normalized = normalize_log(line)
-            if normalized:
-                with cache_lock:
-                    repeat_cache[normalized] = repeat_cache.get(normalized, 0) + 1
-    
+
+                buf += chunk
+                lines = buf.split(b"\n")
+                buf = lines.pop()  # keep any trailing partial line
+
+                for raw in lines:
+                    line = raw.decode("utf-8", errors="replace").strip()
+                    if line:
+                        normalized = normalize_log(line)
+                        if normalized:
+                            pending[normalized] += 1
+            elif proc.poll() is not None:
+                # Process has terminated
+                break
+
+            # Merge once per batch (or once per interval on slow streams)
+            if (len(pending) >= MERGE_BATCH_SIZE
+                    or time.monotonic() - last_merge > MERGE_INTERVAL):
+                _merge_counts(pending)
+                last_merge = time.monotonic()
+
     except Exception as e:
         print(f"Error in journalctl watcher: {e}", file=sys.stderr)
-    
+
     finally:
+        # Don't drop lines counted since the last merge
+        _merge_counts(pending)
+
         if proc and proc.poll() is None:
             proc.terminate()
             try:
@@ -115,6 +261,99 @@ def watch_journalctl():
                 proc.kill()
 
 
+def _watch_journal_native_once():
+    """
+    Run one native journal session until it fails or shutdown is requested.
+
+    Used instead of the journalctl watcher when the systemd bindings are
+    installed. The thread blocks in sd_journal_wait until new entries
+    land, then drains them into the same batched cache merge the
+    journalctl watcher uses. Native entries carry the message and
+    identifier as separate fields, so no timestamp/hostname header ever
+    has to be formatted and re-parsed.
+    """
+    reader = None
+    pending = Counter()  # local {normalized_message: count}, merged in batches
+
+    try:
+        reader = sd_journal.Reader()
+        reader.this_boot()
+        reader.seek_tail()
+        reader.get_previous()
+
+        last_merge = time.monotonic()
+
+        while not shutdown_event.is_set():
+            # Blocks in the kernel until new entries arrive (or timeout,
+            # which keeps the periodic merge honest on idle systems)
+            reader.wait(MERGE_INTERVAL)
+
+            for entry in reader:
+                msg = entry.get("MESSAGE")
+                if not msg:
+                    continue
+                if isinstance(msg, bytes):
+                    msg = msg.decode("utf-8", errors="replace")
+
+                # Rebuild "identifier: message" so dedup keys match the
+                # journalctl short-format path after normalization
+                ident = entry.get("SYSLOG_IDENTIFIER") or entry.get("_COMM")
+                line = f"{ident}: {msg}" if ident else msg
+
+                normalized = normalize_log(line)
+                if normalized:
+                    pending[normalized] += 1
+
+            # Merge once per batch (or once per interval on slow streams)
+            if (len(pending) >= MERGE_BATCH_SIZE
+                    or time.monotonic() - last_merge > MERGE_INTERVAL):
+                _merge_counts(pending)
+                last_merge = time.monotonic()
+
+    except Exception as e:
+        print(f"Error in journal reader: {e}", file=sys.stderr)
+
+    finally:
+        # Don't drop lines counted since the last merge
+        _merge_counts(pending)
+
+        if reader is not None:
+            reader.close()
+
+
+def watch_journalctl():
+    """
+    Stream logs from journalctl for the life of the process.
+
+    The subprocess handle is opened once and kept for as long as the
+    stream lives; journalctl is only respawned if it actually dies,
+    after a short delay.
+    """
+    while not shutdown_event.is_set():
+        _watch_journalctl_once()
+        if shutdown_event.is_set():
+            break
+        print("journalctl stream ended; restarting...", file=sys.stderr)
+        if shutdown_event.wait(timeout=RECONNECT_DELAY):
+            break
+
+
+def watch_journal_native():
+    """
+    Stream logs from the systemd journal for the life of the process.
+
+    The journal reader is opened once and kept for as long as it works;
+    it is only reopened if reading actually fails, after a short delay.
+    """
+    while not shutdown_event.is_set():
+        _watch_journal_native_once()
+        if shutdown_event.is_set():
+            break
+        print("Journal reader stopped; reopening...", file=sys.stderr)
+        if shutdown_event.wait(timeout=RECONNECT_DELAY):
+            break
+
+
 def repeat_flusher():
     """
     Periodically flush cached log entries to the embedding queue.
@@ -124,48 +363,63 @@ def repeat_flusher():
     - Sends single occurrences as-is
     - Summarizes repeated messages as "⏱ timestamp | message repeated Nx"
     """
+    global repeat_cache
     next_id = 0
-    
+
     while not shutdown_event.is_set():
-        # Use shutdown-aware sleep
+        # Sleep until the watcher merges new lines, so an idle system
+        # doesn't wake this thread every interval for nothing
+        with cache_cv:
+            while not repeat_cache and not shutdown_event.is_set():
+                cache_cv.wait(timeout=FLUSH_INTERVAL)
+
+        # Let repeats accumulate for a full interval before summarizing
         if shutdown_event.wait(timeout=FLUSH_INTERVAL):
             break
-        
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Atomically extract and clear cache
+
+        # Swap in a fresh cache so the lock is held for a pointer swap,
+        # not a copy of every entry; the drained dict is walked unlocked
         with cache_lock:
-            items = list(repeat_cache.items())
-            repeat_cache.clear()
-        
-        # Process cached entries
-        for msg, count in items:
-            if not msg:
-                continue
-            
-            ts = time.time()
-            
-            if count == 1:
-                # Single occurrence - no summarization needed
-                log_queue.put((next_id, msg, ts))
-            else:
-                # Multiple occurrences - create summary
-                summary = f'⏱ {now} | "{msg}" repeated {count}x'
-                log_queue.put((next_id, summary, ts))
-            
-            next_id += 1
+            drained, repeat_cache = repeat_cache, Counter()
+
+        if not drained:
+            continue
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ts = time.time()  # entries flushed together share one stamp
+
+        # Build the batch in one pass - singles go out as-is, repeats as
+        # summaries - then hand it to the embed worker with a single
+        # queue operation
+        batch = [
+            (next_id + i,
+             msg if count == 1 else f'⏱ {now} | "{msg}" repeated {count}x',
+             ts)
+            for i, (msg, count) in enumerate(
+                item for item in drained.items() if item[0]
+            )
+        ]
+        next_id += len(batch)
+
+        if batch:
+            log_queue.put(batch)
     
     # Final flush on shutdown
     with cache_lock:
-        items = list(repeat_cache.items())
-        repeat_cache.clear()
-    
-    for msg, count in items:
-        if msg:
-            ts = time.time()
-            summary = f'⏱ {now} | "{msg}" repeated {count}x' if count > 1 else msg
-            log_queue.put((next_id, summary, ts))
-            next_id += 1
+        drained, repeat_cache = repeat_cache, Counter()
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    ts = time.time()
+    batch = [
+        (next_id + i,
+         msg if count == 1 else f'⏱ {now} | "{msg}" repeated {count}x',
+         ts)
+        for i, (msg, count) in enumerate(
+            item for item in drained.items() if item[0]
+        )
+    ]
+    if batch:
+        log_queue.put(batch)
 
 
 def embed_worker():
@@ -186,12 +440,16 @@ def embed_worker():
         
         try:
             embeddings = model.encode(batch_texts, convert_to_numpy=True)
-            index.add(embeddings)
-            
-            # Update metadata with thread safety
+
+            # Index and metadata must stay in sync, so both mutations
+            # happen under the same lock the search path takes; extending
+            # the parallel arrays copies the batch lists before they are
+            # cleared below
             with metadata_lock:
-                for i, txt, tstamp in zip(batch_ids, batch_texts, batch_timestamps):
-                    metadata.append({"id": i, "text": txt, "timestamp": tstamp})
+                index.add(embeddings)
+                meta_ids.extend(batch_ids)
+                meta_texts.extend(batch_texts)
+                meta_timestamps.extend(batch_timestamps)
         
         except Exception as e:
             print(f"Error processing batch: {e}", file=sys.stderr)
@@ -203,20 +461,21 @@ def embed_worker():
     
     while not shutdown_event.is_set():
         try:
-            _id, text, ts = log_queue.get(timeout=1.0)
+            flushed = log_queue.get(timeout=1.0)
         except queue.Empty:
             # Flush partial batch if any
             process_batch()
             continue
-        
-        # Add to batch
-        batch_ids.append(_id)
-        batch_texts.append(text)
-        batch_timestamps.append(ts)
-        
-        # Process when batch is full
-        if len(batch_texts) >= BATCH_SIZE:
-            process_batch()
+
+        # The flusher hands over a whole batch per queue item
+        for _id, text, ts in flushed:
+            batch_ids.append(_id)
+            batch_texts.append(text)
+            batch_timestamps.append(ts)
+
+            # Process when batch is full
+            if len(batch_texts) >= BATCH_SIZE:
+                process_batch()
     
     # Final flush on shutdown
     process_batch()
@@ -238,29 +497,33 @@ def search_query(q: str, k: int, display_mode: str):
         # Generate query embedding
         q_emb = model.encode([q], convert_to_numpy=True)
         
-        # Search FAISS index
+        # Search FAISS index; hold the lock only for the search itself and
+        # a snapshot of the matching entries, so the embed thread isn't
+        # blocked while results are formatted
         with metadata_lock:
             if index.ntotal == 0:
                 return ["No logs indexed yet. Please wait for data to accumulate."]
-            
+
             # Adjust k to not exceed available entries
             k_adjusted = min(k, index.ntotal)
             D, I = index.search(q_emb, k_adjusted)
-            
-            results = []
+
+            hits = []
             for dist, idx in zip(D[0], I[0]):
                 # FAISS returns -1 for invalid indices
-                if idx < 0 or idx >= len(metadata):
+                if idx < 0 or idx >= len(meta_texts):
                     continue
-                
-                meta = metadata[idx]
-                if display_mode == "raw":
-                    results.append(meta["text"])
-                else:
-                    results.append(
-                        f"{meta['timestamp']:.3f} | dist={dist:.3f} | {meta['text']}"
-                    )
-        
+                hits.append((dist, meta_texts[idx], meta_timestamps[idx]))
+
+        results = []
+        for dist, text, tstamp in hits:
+            if display_mode == "raw":
+                results.append(text)
+            else:
+                results.append(
+                    f"{tstamp:.3f} | dist={dist:.3f} | {text}"
+                )
+
         return results
     
     except Exception as e:
@@ -336,8 +599,10 @@ def main():
         print("Cannot start system without models. Exiting.")
         return 1
     
-    # Start background threads
-    watcher_thread = threading.Thread(target=watch_journalctl, daemon=True)
+    # Start background threads; prefer the native journal reader and fall
+    # back to the journalctl subprocess when the bindings are missing
+    watch_target = watch_journal_native if sd_journal is not None else watch_journalctl
+    watcher_thread = threading.Thread(target=watch_target, daemon=True)
     flusher_thread = threading.Thread(target=repeat_flusher, daemon=True)
     embed_thread = threading.Thread(target=embed_worker, daemon=True)
     
@@ -376,19 +641,20 @@ def main():
             # Execute search
             hits = search_query(query_text, k, display_mode)
             
-            # Display results
-            print("-" * 80)
-            print(f"Top {k} results (display={display_mode}):")
-            for result in hits:
-                print(result)
-            print("-" * 80)
-            print()
+            # Display results with a single write instead of one per line
+            sep = "-" * 80
+            lines = [sep, f"Top {k} results (display={display_mode}):"]
+            lines.extend(hits)
+            lines.extend((sep, ""))
+            print("\n".join(lines))
     
     finally:
         # Graceful shutdown
         print("Shutting down background threads...")
         shutdown_event.set()
-        
+        with cache_cv:
+            cache_cv.notify_all()
+
         # Give threads time to finish
         watcher_thread.join(timeout=2)
         flusher_thread.join(timeout=2)